@@ -0,0 +1,166 @@
+"""
+Offline scoring of recorded clips and text journals.
+
+Walks input directories and scores every file with the same logic the API
+uses (classify_mood_from_voice_bytes / classify_mood_from_text), spread over a
+process pool. Results are appended to a JSONL file as they arrive, so an
+interrupted run picks up where it left off when started again. The output
+holds one record per scored file; files that fail go to a separate error log
+(rewritten on every run) and are retried on the next one.
+
+    python batch_score.py recordings/ journals/ -o scores.jsonl --workers 8
+"""
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional
+
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from scoring import classify_mood_from_text, classify_mood_from_voice_bytes
+
+AUDIO_EXTENSIONS = {".webm", ".wav", ".ogg", ".mp3", ".m4a", ".flac", ".aac"}
+TEXT_EXTENSIONS = {".txt", ".md"}
+PROGRESS_INTERVAL = 2.0  # seconds between progress lines
+
+# Set per worker process by init_worker.
+worker_analyzer: Optional[SentimentIntensityAnalyzer] = None
+
+
+def init_worker():
+    global worker_analyzer
+    worker_analyzer = SentimentIntensityAnalyzer()
+
+
+def file_kind(path: str) -> Optional[str]:
+    ext = os.path.splitext(path)[1].lower()
+    if ext in AUDIO_EXTENSIONS:
+        return "voice"
+    if ext in TEXT_EXTENSIONS:
+        return "text"
+    return None
+
+
+def walk_inputs(input_dirs: List[str]) -> Iterator[str]:
+    for input_dir in input_dirs:
+        for root, dirs, files in os.walk(input_dir):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if file_kind(path):
+                    yield os.path.abspath(path)
+
+
+def score_voice(path: str) -> dict:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap cannot map an empty file
+            mood, energy, tempo = classify_mood_from_voice_bytes(b"")
+        else:
+            # Map the clip instead of reading it; the heuristic only needs its length.
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                mood, energy, tempo = classify_mood_from_voice_bytes(data)
+    return {"mood": mood, "energy": energy, "tempo": tempo}
+
+
+def score_text(path: str) -> dict:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    mood, score = classify_mood_from_text(text, worker_analyzer)
+    return {"mood": mood, "sentiment_score": score}
+
+
+def score_file(path: str) -> dict:
+    kind = file_kind(path)
+    record = {"path": path, "kind": kind}
+    try:
+        record.update(score_voice(path) if kind == "voice" else score_text(path))
+    except (OSError, ValueError) as e:
+        # ValueError covers files mmap refuses (e.g. special files); record
+        # the failure rather than aborting the whole pool.map.
+        record["error"] = str(e)
+    return record
+
+
+def load_done_paths(output_path: str) -> set:
+    """
+    Paths already scored by a previous run. A truncated last line from an
+    interrupted run is ignored, so that file is scored again.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["path"])
+            except (ValueError, KeyError, TypeError):
+                continue
+    return done
+
+
+def open_output(output_path: str):
+    out = open(output_path, "a+", encoding="utf-8")
+    # Start on a fresh line if the previous run was cut off mid-record.
+    if out.tell() > 0:
+        out.seek(out.tell() - 1)
+        if out.read(1) != "\n":
+            out.write("\n")
+    return out
+
+
+def run(input_dirs: List[str], output_path: str, error_path: str, workers: int, chunksize: int) -> int:
+    done = load_done_paths(output_path)
+    paths = [path for path in walk_inputs(input_dirs) if path not in done]
+    total = len(paths)
+    print(f"{len(done)} already scored, {total} to go with {workers} workers", file=sys.stderr)
+
+    scored = failed = 0
+    start = last_report = time.monotonic()
+    with open_output(output_path) as out, open(error_path, "w", encoding="utf-8") as errors, \
+            ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        for record in pool.map(score_file, paths, chunksize=chunksize):
+            if "error" in record:
+                errors.write(json.dumps(record) + "\n")
+                failed += 1
+            else:
+                out.write(json.dumps(record) + "\n")
+            scored += 1
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL or scored == total:
+                out.flush()
+                errors.flush()
+                last_report = now
+                rate = scored / max(now - start, 1e-9)
+                print(f"{scored}/{total} files, {failed} failed, {rate:.1f} files/s", file=sys.stderr)
+    return scored
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Score voice clips and text journals offline.")
+    parser.add_argument("inputs", nargs="+", help="directories to scan")
+    parser.add_argument("-o", "--output", default="scores.jsonl", help="JSONL output (appended to, resumable)")
+    parser.add_argument("--errors", help="JSONL log of files that failed (default: <output>.errors.jsonl)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunksize", type=int, default=64, help="files handed to a worker at a time")
+    args = parser.parse_args(argv)
+
+    for input_dir in args.inputs:
+        if not os.path.isdir(input_dir):
+            parser.error(f"not a directory: {input_dir}")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.chunksize < 1:
+        parser.error("--chunksize must be at least 1")
+
+    error_path = args.errors or os.path.splitext(args.output)[0] + ".errors.jsonl"
+    run(args.inputs, args.output, error_path, args.workers, args.chunksize)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Closed-loop load test for POST /api/chat.
+
+Runs a fixed number of concurrent clients against a running server and reports
+latency percentiles over every request and the degradation levels applied.
+Any non-200 reply aborts the run rather than being left out of the
+percentiles. Requests are written as raw HTTP/1.1 over keep-alive sockets so the load generator stays much cheaper
+than the server; a heavyweight client on the same host ends up measuring its
+own scheduling delay instead of the server's.
+
+    uvicorn main:app --port 8000
+    python loadtest.py --concurrency 10 50 --duration 10
+"""
+import argparse
+import asyncio
+import collections
+import json
+import time
+from typing import List, Optional
+from urllib.parse import urlsplit
+
+HISTORY = [
+    {"role": "user", "content": "my boss keeps piling on work lately and I feel really overwhelmed"},
+    {"role": "bot", "content": "That sounds like a lot to carry."},
+] * 5
+MESSAGE = "I feel really anxious about my job and my family lately"
+
+
+def build_request(host: str) -> bytes:
+    body = json.dumps({"message": MESSAGE, "conversation_history": HISTORY}).encode()
+    head = (
+        f"POST /api/chat HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    )
+    return head.encode() + body
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[int, dict, bytes]:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", "0")))
+    return status, headers, body
+
+
+async def client_loop(host: str, port: int, request: bytes, stop: float, stats: dict):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.monotonic() < stop:
+            start = time.monotonic()
+            writer.write(request)
+            status, _, body = await read_response(reader)
+            if status != 200:
+                raise RuntimeError(f"unexpected status {status}: {body[:200]!r}")
+            stats["latencies"].append(time.monotonic() - start)
+            stats["levels"][json.loads(body)["degradation_level"]] += 1
+    finally:
+        writer.close()
+
+
+async def run_level(base_url: str, concurrency: int, duration: float) -> dict:
+    url = urlsplit(base_url)
+    request = build_request(url.netloc)
+    stats = {"latencies": [], "levels": collections.Counter()}
+    stop = time.monotonic() + duration
+    await asyncio.gather(*[
+        client_loop(url.hostname, url.port or 80, request, stop, stats) for _ in range(concurrency)
+    ])
+    return stats
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    return sorted_values[int(q * (len(sorted_values) - 1))]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test POST /api/chat.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    args = parser.parse_args(argv)
+
+    baseline_p99 = None
+    for concurrency in args.concurrency:
+        stats = asyncio.run(run_level(args.url, concurrency, args.duration))
+        latencies = sorted(stats["latencies"])
+        p50 = percentile(latencies, 0.50) * 1000
+        p99 = percentile(latencies, 0.99) * 1000
+        if baseline_p99 is None:
+            baseline_p99 = p99
+        print(
+            f"concurrency={concurrency} replies={len(latencies)} "
+            f"p50={p50:.1f}ms p99={p99:.1f}ms ({p99 / baseline_p99:.1f}x baseline) "
+            f"levels={dict(sorted(stats['levels'].items()))}"
+        )
+
+
+if __name__ == "__main__":
+    main()
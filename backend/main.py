@@ -1,12 +1,25 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import uvicorn
+import asyncio
+import contextlib
+import gzip
+import hashlib
 import io
+import os
 import random
+import time
 from typing import List, Optional
 
+from scoring import classify_mood_from_text, classify_mood_from_voice_bytes
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
 
 class TextMessage(BaseModel):
     message: str
@@ -17,6 +30,8 @@ class ChatResponse(BaseModel):
     mood: str
     sentiment_score: float
     reply: str
+    degradation_level: int = 0  # level applied to this reply; see DEGRADE_* levels
+    overload_level: int = 0     # server-wide level when the request arrived
 
 
 class VoiceResponse(BaseModel):
@@ -26,7 +41,18 @@ class VoiceResponse(BaseModel):
     reply: str
 
 
-app = FastAPI(title="Mental Health Companion API")
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Hash and compress the frontend once per server start (and per --reload).
+    app.state.index_asset, app.state.static_assets = load_frontend_assets(FRONTEND_DIR)
+    overload.start()
+    try:
+        yield
+    finally:
+        await overload.stop()
+
+
+app = FastAPI(title="Mental Health Companion API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -38,41 +64,241 @@ app.add_middleware(
 
 sentiment_analyzer = SentimentIntensityAnalyzer()
 
+# Load-shedding levels for /api/chat, each one skipping more of the reply pipeline.
+DEGRADE_NONE = 0
+DEGRADE_SKIP_HISTORY = 1          # ignore conversation_history (no history scan / follow-ups)
+DEGRADE_SKIP_PERSONALIZATION = 2  # no context extraction; base keyword responses as-is
+DEGRADE_MOOD_ONLY = 3             # template reply from the VADER mood alone
+
+# Thresholds to enter levels 1, 2 and 3.
+QUEUE_DEPTH_THRESHOLDS = (12, 16, 20)        # in-flight /api/chat requests
+LOOP_LAG_THRESHOLDS = (0.01, 0.02, 0.03)     # seconds the event loop is behind
+LAG_PROBE_INTERVAL = 0.01
+LAG_SMOOTHING = 0.5
+RECOVERY_INTERVAL = 1.0  # seconds below threshold before easing down one level
+
+# Messages with these phrases always get the full reply, whatever the level.
+CRISIS_PHRASES = ["suicide", "suicidal", "kill myself", "end my life", "end it all",
+                  "want to die", "wanna die", "better off dead", "no reason to live",
+                  "self harm", "self-harm", "hurt myself", "cut myself", "cutting myself"]
+
+
+class OverloadController:
+    """
+    Tracks in-flight chat requests and event-loop lag and picks a degradation
+    level. Levels rise as soon as a threshold is crossed and ease back down one
+    step at a time once load has stayed below it for RECOVERY_INTERVAL.
+    """
+
+    def __init__(self):
+        self.queue_depth = 0
+        self.loop_lag = 0.0
+        self.level = DEGRADE_NONE
+        self._calm_since = None
+        self._probe_task = None
+
+    def start(self):
+        """Start the event-loop lag probe on the running loop (from the app lifespan)."""
+        self.loop_lag = 0.0
+        self.level = DEGRADE_NONE
+        self._calm_since = time.monotonic()
+        self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop_lag())
+
+    async def stop(self):
+        if self._probe_task is None:
+            return
+        self._probe_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._probe_task
+        self._probe_task = None
+
+    async def _probe_loop_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            lag = max(0.0, loop.time() - start - LAG_PROBE_INTERVAL)
+            self.loop_lag = LAG_SMOOTHING * lag + (1 - LAG_SMOOTHING) * self.loop_lag
+            self.update()
+
+    def target_level(self) -> int:
+        level = DEGRADE_NONE
+        for i, (depth, lag) in enumerate(zip(QUEUE_DEPTH_THRESHOLDS, LOOP_LAG_THRESHOLDS), start=1):
+            if self.queue_depth >= depth or self.loop_lag >= lag:
+                level = i
+        return level
+
+    def update(self) -> int:
+        target = self.target_level()
+        now = time.monotonic()
+        if target >= self.level:
+            self.level = target
+            self._calm_since = now
+        elif now - self._calm_since >= RECOVERY_INTERVAL:
+            self.level -= 1
+            self._calm_since = now
+        return self.level
+
+    def enter(self) -> int:
+        self.queue_depth += 1
+        return self.update()
+
+    def exit(self):
+        self.queue_depth -= 1
+
+
+overload = OverloadController()
+
+
+class ChatLoadMiddleware:
+    """
+    Plain ASGI middleware that counts /api/chat requests from arrival, so the
+    queue depth includes those still waiting for their body and handler.
+    Other routes pass straight through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != "/api/chat":
+            await self.app(scope, receive, send)
+            return
+
+        level = overload.enter()
+        try:
+            scope.setdefault("state", {})["degradation_level"] = level
+            await self.app(scope, receive, send)
+        finally:
+            overload.exit()
+
+
+app.add_middleware(ChatLoadMiddleware)
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "frontend")
+STATIC_PREFIX = "/static/"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+CONTENT_TYPES = {
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".html": "text/html; charset=utf-8",
+}
+
 # In-memory conversation context (simple approach for demo)
 # In production, you'd use sessions or a database
 conversation_contexts = {}
 
 
-def classify_mood_from_text(text: str) -> tuple[str, float]:
-    scores = sentiment_analyzer.polarity_scores(text)
-    compound = scores["compound"]
-    if compound >= 0.5:
-        mood = "very positive"
-    elif compound >= 0.1:
-        mood = "positive"
-    elif compound > -0.1:
-        mood = "neutral"
-    elif compound > -0.5:
-        mood = "negative"
-    else:
-        mood = "very negative"
-    return mood, compound
+def build_static_asset(name: str, body: bytes) -> dict:
+    """
+    Prepare one frontend file for serving: a strong ETag from its content hash
+    plus gzip (and brotli, when installed) variants compressed once up front.
+    """
+    digest = hashlib.sha256(body).hexdigest()[:12]
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return {
+        "name": name,
+        "hash": digest,
+        "content_type": CONTENT_TYPES.get(os.path.splitext(name)[1], "application/octet-stream"),
+        "variants": variants,
+    }
 
 
-def extract_context_info(text: str, conversation_history: Optional[List[dict]] = None) -> dict:
+def load_frontend_assets(frontend_dir: str) -> tuple[Optional[dict], dict]:
     """
-    Extract specific details from the message and conversation history
-    to create more personalized responses.
+    Read the frontend once at startup. CSS/JS files are published under
+    content-hashed names (styles.<hash>.css) and index.html is rewritten to
+    point at them, so the assets can be cached forever while index.html stays
+    revalidated on every load.
     """
+    html_path = os.path.join(frontend_dir, "index.html")
+    if not os.path.isfile(html_path):
+        return None, {}
+    with open(html_path, "r", encoding="utf-8") as f:
+        html = f.read()
+
+    assets = {}
+
+    for name in sorted(os.listdir(frontend_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext not in (".css", ".js"):
+            continue
+        with open(os.path.join(frontend_dir, name), "rb") as f:
+            asset = build_static_asset(name, f.read())
+        hashed_name = f"{stem}.{asset['hash']}{ext}"
+        assets[hashed_name] = asset
+        for attr in ("href", "src"):
+            html = html.replace(f'{attr}="{name}"', f'{attr}="{STATIC_PREFIX}{hashed_name}"')
+
+    return build_static_asset("index.html", html.encode("utf-8")), assets
+
+
+def pick_encoding(accept_encoding: str, variants: dict) -> str:
+    """
+    Prefer brotli, then gzip, falling back to the uncompressed body. An
+    explicit q=0 refusal wins over a "*" wildcard.
+    """
+    accepted = set()
+    refused = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.partition(";")
+        token = token.strip().lower()
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    refused.add(token)
+                    continue
+            except ValueError:
+                refused.add(token)
+                continue
+        accepted.add(token)
+    for encoding in ("br", "gzip"):
+        if encoding in variants and encoding not in refused and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+
+def static_response(request: Request, asset: dict, cache_control: str) -> Response:
+    encoding = pick_encoding(request.headers.get("accept-encoding", ""), asset["variants"])
+    # Each encoding is a different byte sequence, so it gets its own strong ETag.
+    etag = f'"{asset["hash"]}"' if encoding == "identity" else f'"{asset["hash"]}-{encoding}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=asset["variants"][encoding], media_type=asset["content_type"], headers=headers)
+
+
+def is_crisis_message(text: str) -> bool:
     lowered = text.lower()
-    context = {
+    return any(phrase in lowered for phrase in CRISIS_PHRASES)
+
+
+def empty_context() -> dict:
+    return {
         "mentioned_people": [],
         "specific_problems": [],
         "time_references": [],
         "previous_topics": [],
         "recurring_themes": [],
-        "intensity_indicators": []
+        "intensity_indicators": "low",
     }
+
+
+def extract_context_info(text: str, conversation_history: Optional[List[dict]] = None) -> dict:
+    """
+    Extract specific details from the message and conversation history
+    to create more personalized responses.
+    """
+    lowered = text.lower()
+    context = empty_context()
     
     # Extract people mentioned
     people_keywords = ["my partner", "my boyfriend", "my girlfriend", "my spouse", "my friend", 
@@ -119,11 +345,16 @@ def extract_context_info(text: str, conversation_history: Optional[List[dict]] =
     return context
 
 
-def create_personalized_response(text: str, mood: str, context: dict, base_responses: List[str]) -> str:
+def create_personalized_response(
+    text: str, mood: str, context: dict, base_responses: List[str], personalize: bool = True
+) -> str:
     """
     Take a base response and personalize it based on extracted context.
+    With personalize=False the base response is returned as-is.
     """
     response = random.choice(base_responses)
+    if not personalize:
+        return response
     lowered = text.lower()
     
     # Add personalization based on context
@@ -178,7 +409,12 @@ def create_personalized_response(text: str, mood: str, context: dict, base_respo
     return response
 
 
-def therapeutic_reply(text: str, mood: str, conversation_history: Optional[List[dict]] = None) -> str:
+def therapeutic_reply(
+    text: str,
+    mood: str,
+    conversation_history: Optional[List[dict]] = None,
+    degradation_level: int = DEGRADE_NONE,
+) -> str:
     """
     Enhanced therapeutic response system with:
     - Much more variety (15-20 responses per category)
@@ -186,11 +422,20 @@ def therapeutic_reply(text: str, mood: str, conversation_history: Optional[List[
     - Natural, human-like conversation
     - Context awareness from conversation history
     - Personalized responses based on extracted details
+
+    Under load, degradation_level drops the history scan and then context
+    extraction and personalization (see DEGRADE_* levels).
     """
     lowered = text.lower()
+    if degradation_level >= DEGRADE_SKIP_HISTORY:
+        conversation_history = None
     
     # Extract context information
-    context = extract_context_info(text, conversation_history)
+    personalize = degradation_level < DEGRADE_SKIP_PERSONALIZATION
+    if personalize:
+        context = extract_context_info(text, conversation_history)
+    else:
+        context = empty_context()
     
     # Check if this is a follow-up or continuation
     continuation_phrases = ["yes", "no", "maybe", "i don't know", "i think", "i feel like", 
@@ -274,7 +519,7 @@ def therapeutic_reply(text: str, mood: str, conversation_history: Optional[List[
             "pause and ask: 'What would I say to a friend who felt this way?' Then say that to yourself. "
             "What's one thing you could do right now that would be an act of self-compassion?",
         ]
-        return create_personalized_response(text, mood, context, responses)
+        return create_personalized_response(text, mood, context, responses, personalize)
     
     # Check for specific emotional states with many varied responses
     if any(word in lowered for word in anxiety_words):
@@ -349,7 +594,7 @@ def therapeutic_reply(text: str, mood: str, conversation_history: Optional[List[
             "Then, pick one and reach out this week—even if it's been years. Most people appreciate hearing from someone. "
             "What's one relationship you'd like to nurture more?",
         ]
-        return create_personalized_response(text, mood, context, responses)
+        return create_personalized_response(text, mood, context, responses, personalize)
     
     if any(word in lowered for word in anger_words):
         responses = [
@@ -382,7 +627,7 @@ def therapeutic_reply(text: str, mood: str, conversation_history: Optional[List[
             "For example, instead of 'They never listen,' try 'I need to feel heard.' This shifts from blame to expressing needs. "
             "What need of yours isn't being met in this situation?",
         ]
-        return create_personalized_response(text, mood, context, responses)
+        return create_personalized_response(text, mood, context, responses, personalize)
     
     if any(word in lowered for word in sad_words):
         responses = [
@@ -430,7 +675,7 @@ def therapeutic_reply(text: str, mood: str, conversation_history: Optional[List[
             "get up and do one thing. When it says 'isolate,' reach out to one person. "
             "What's one small action you could take right now that would be the opposite of what depression is telling you to do?",
         ]
-        return create_personalized_response(text, mood, context, responses)
+        return create_personalized_response(text, mood, context, responses, personalize)
     
     if any(word in lowered for word in sleep_words):
         responses = [
@@ -454,7 +699,7 @@ def therapeutic_reply(text: str, mood: str, conversation_history: Optional[List[
             "Fourth, consider if anxiety or depression might be contributing—treating the underlying mental health issue often improves sleep. "
             "What do you think is the main thing disrupting your sleep?",
         ]
-        return create_personalized_response(text, mood, context, responses)
+        return create_personalized_response(text, mood, context, responses, personalize)
     
     if any(word in lowered for word in work_words):
         responses = [
@@ -478,7 +723,7 @@ def therapeutic_reply(text: str, mood: str, conversation_history: Optional[List[
             "or consider if this job is the right fit long-term. "
             "What's one boundary you could set at work that would help you feel less overwhelmed?",
         ]
-        return create_personalized_response(text, mood, context, responses)
+        return create_personalized_response(text, mood, context, responses, personalize)
     
     if any(word in lowered for word in relationship_words):
         responses = [
@@ -502,7 +747,7 @@ def therapeutic_reply(text: str, mood: str, conversation_history: Optional[List[
             "it's a tool for improving communication and connection. "
             "What's the core need that isn't being met in this relationship?",
         ]
-        return create_personalized_response(text, mood, context, responses)
+        return create_personalized_response(text, mood, context, responses, personalize)
     
     # Mood-based responses with more variety
     if mood in ("very positive", "positive"):
@@ -530,7 +775,7 @@ def therapeutic_reply(text: str, mood: str, conversation_history: Optional[List[
             "Also, consider what contributed to this positive feeling—how can you create more of those conditions? "
             "What's one thing you could do to build on this positive energy?",
         ]
-        return create_personalized_response(text, mood, context, responses)
+        return create_personalized_response(text, mood, context, responses, personalize)
     
     if mood in ("negative", "very negative"):
         responses = [
@@ -559,7 +804,7 @@ def therapeutic_reply(text: str, mood: str, conversation_history: Optional[List[
             "Small steps forward still count. Also, consider: what's one thing that would make today just 5% more bearable? "
             "Sometimes 5% is enough to get through the day. What's that one thing for you?",
         ]
-        return create_personalized_response(text, mood, context, responses)
+        return create_personalized_response(text, mood, context, responses, personalize)
     
     # Neutral/general responses with more variety
     responses = [
@@ -590,34 +835,7 @@ def therapeutic_reply(text: str, mood: str, conversation_history: Optional[List[
         "Also, what do you notice in your body as you talk about this? Our bodies often know things before our minds do. "
         "What would it feel like to explore this a bit more?",
     ]
-    return create_personalized_response(text, mood, context, responses)
-
-
-def classify_mood_from_voice_bytes(data: bytes) -> tuple[str, float, float]:
-    """
-    Very lightweight heuristic based only on recording size.
-    This avoids heavy audio libraries while still giving a simple mood signal.
-    """
-    size_kb = len(data) / 1024.0
-
-    if size_kb < 20:
-        mood = "very low energy / very short recording"
-        energy = 0.2
-        tempo = 60.0
-    elif size_kb < 80:
-        mood = "low to moderate energy"
-        energy = 0.4
-        tempo = 80.0
-    elif size_kb < 200:
-        mood = "moderate energy"
-        energy = 0.6
-        tempo = 100.0
-    else:
-        mood = "high energy / long or loud recording"
-        energy = 0.85
-        tempo = 120.0
-
-    return mood, energy, tempo
+    return create_personalized_response(text, mood, context, responses, personalize)
 
 
 def therapeutic_reply_from_voice(mood: str) -> str:
@@ -678,16 +896,49 @@ def therapeutic_reply_from_voice(mood: str) -> str:
     return random.choice(responses)
 
 
+def mood_only_reply(mood: str) -> str:
+    """
+    Short template reply used at DEGRADE_MOOD_ONLY, based on the VADER mood alone.
+    """
+    if mood == "very negative":
+        return ("I can hear that things feel really heavy right now, and I'm glad you reached out. "
+                "Try taking a few slow breaths with me: in for 4, hold for 4, out for 6. "
+                "What feels hardest at this moment?")
+    if mood == "negative":
+        return ("It sounds like you're having a tough time. Your feelings are valid. "
+                "What's been weighing on you the most?")
+    if mood in ("positive", "very positive"):
+        return ("It's good to hear some brightness in what you're sharing. "
+                "What's been helping you feel this way?")
+    return "Thank you for sharing that with me. How are you feeling as you think about it?"
+
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(message: TextMessage):
-    mood, score = classify_mood_from_text(message.message)
-    # Pass conversation history for context awareness (if provided)
-    reply = therapeutic_reply(
-        message.message, 
-        mood, 
-        conversation_history=message.conversation_history
+async def chat(message: TextMessage, request: Request):
+    mood, score = classify_mood_from_text(message.message, sentiment_analyzer)
+    overload_level = getattr(request.state, "degradation_level", DEGRADE_NONE)
+    level = overload_level
+    if is_crisis_message(message.message):
+        # Never shed replies to crisis messages.
+        level = DEGRADE_NONE
+
+    if level >= DEGRADE_MOOD_ONLY:
+        reply = mood_only_reply(mood)
+    else:
+        # Pass conversation history for context awareness (if provided)
+        reply = therapeutic_reply(
+            message.message, 
+            mood, 
+            conversation_history=message.conversation_history,
+            degradation_level=level,
+        )
+    return ChatResponse(
+        mood=mood,
+        sentiment_score=score,
+        reply=reply,
+        degradation_level=level,
+        overload_level=overload_level,
     )
-    return ChatResponse(mood=mood, sentiment_score=score, reply=reply)
 
 
 @app.post("/api/analyze_voice", response_model=VoiceResponse)
@@ -703,7 +954,24 @@ async def analyze_voice(file: UploadFile = File(...)):
 
 @app.get("/api/health")
 async def health():
-    return {"status": "ok"}
+    return {"status": "ok", "degradation_level": overload.level}
+
+
+@app.api_route("/", methods=["GET", "HEAD"], include_in_schema=False)
+async def frontend_index(request: Request):
+    index_asset = getattr(request.app.state, "index_asset", None)
+    if index_asset is None:
+        raise HTTPException(status_code=404, detail="Frontend not found")
+    # index.html is small and references the hashed assets, so always revalidate it.
+    return static_response(request, index_asset, "no-cache")
+
+
+@app.api_route(STATIC_PREFIX + "{filename}", methods=["GET", "HEAD"], include_in_schema=False)
+async def frontend_static(filename: str, request: Request):
+    asset = getattr(request.app.state, "static_assets", {}).get(filename)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return static_response(request, asset, IMMUTABLE_CACHE)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,50 @@
+"""
+Mood scoring shared by the API and the offline batch scorer.
+
+Kept free of import-time side effects (no app, no analyzer) so worker
+processes can import it cheaply and build their own analyzer.
+"""
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+
+def classify_mood_from_text(text: str, analyzer: SentimentIntensityAnalyzer) -> tuple[str, float]:
+    scores = analyzer.polarity_scores(text)
+    compound = scores["compound"]
+    if compound >= 0.5:
+        mood = "very positive"
+    elif compound >= 0.1:
+        mood = "positive"
+    elif compound > -0.1:
+        mood = "neutral"
+    elif compound > -0.5:
+        mood = "negative"
+    else:
+        mood = "very negative"
+    return mood, compound
+
+
+def classify_mood_from_voice_bytes(data: bytes) -> tuple[str, float, float]:
+    """
+    Very lightweight heuristic based only on recording size.
+    This avoids heavy audio libraries while still giving a simple mood signal.
+    """
+    size_kb = len(data) / 1024.0
+
+    if size_kb < 20:
+        mood = "very low energy / very short recording"
+        energy = 0.2
+        tempo = 60.0
+    elif size_kb < 80:
+        mood = "low to moderate energy"
+        energy = 0.4
+        tempo = 80.0
+    elif size_kb < 200:
+        mood = "moderate energy"
+        energy = 0.6
+        tempo = 100.0
+    else:
+        mood = "high energy / long or loud recording"
+        energy = 0.85
+        tempo = 120.0
+
+    return mood, energy, tempo
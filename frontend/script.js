@@ -1,4 +1,5 @@
-const API_BASE = "http://localhost:8000/api";
+// Served by the API itself, so requests stay same-origin (no CORS preflight).
+const API_BASE = "/api";
 
 // Page elements
 const landingPage = document.getElementById("landing-page");